@@ -12,11 +12,16 @@ parsing to translation and output generation.
 
 Key Features:
 - Parses WebVTT format subtitle files with timestamp preservation
-- Batch processing for efficient API usage (processes 10 subtitles per batch)
+- Batch processing for efficient API usage (packs up to 40 subtitles or 4000 characters per batch)
+- Duplicate subtitle lines are translated once and reused
+- Cues without words (music notes, numbers, punctuation, URLs) are kept as-is without an API call
+- Persistent translation cache (~/.vtt-translate-cache.db, or shared Redis via VTT_REDIS_URL)
+  so repeated runs skip the API
 - Interactive command-line interface with step-by-step progress tracking
 - Animated spinner indicators for visual feedback during translation
 - Automatic dependency checking and installation guidance
 - Environment-based API key management via ~/.env file
+- Retries rate limits and server errors with exponential backoff before falling back
 - Error handling and fallback mechanisms
 - Smart output filename generation (adds "-ko" suffix)
 
@@ -25,63 +30,46 @@ Technical Details:
 - Maintains original timestamp formatting and cue structure
 - Supports subtitle files with or without cue identifiers
 - Preserves line breaks and formatting within subtitle text
+- Streams subtitles from input to output so memory stays bounded on very large files
 - Implements thread-safe spinner animations with ANSI color support
 - Batch translation reduces API calls while maintaining translation quality
+- Dispatches batches concurrently on a thread pool (8 requests in flight by default)
 
 Workflow:
 1. Input file selection (defaults to 'subtitles-en.vtt')
 2. Environment configuration loading and API key validation
 3. VTT file parsing and subtitle extraction
-4. Batch translation processing with progress feedback
-5. Korean VTT file generation with preserved formatting
+4. Output filename generation
+5. Streaming batch translation into the Korean VTT file with progress feedback
 
 Dependencies:
 - google-generativeai: For Gemini AI model integration
 - python-dotenv: For environment variable management
-- Standard Python libraries: os, re, sys, time, threading, pathlib
+- redis (optional): For the shared translation cache when VTT_REDIS_URL is set
+- Standard Python libraries: os, re, sys, mmap, time, argparse, random, sqlite3, tempfile, hashlib, threading, abc, collections, pathlib, itertools, concurrent.futures
 
 Usage:
-Simply run the script and follow the interactive prompts. Ensure your Gemini API key 
-is configured in ~/.env file as GEMINI_API_KEY=your_api_key_here
+Simply run the script and follow the interactive prompts, or pass --input/--output and
+tuning options (--batch-size, --max-chars, --workers, --no-cache); see --help. Ensure your
+Gemini API key is configured in ~/.env file as GEMINI_API_KEY=your_api_key_here
 """
 
 import os
 import re
 import sys
+import mmap
 import time
+import argparse
+import random
+import sqlite3
+import tempfile
+import hashlib
 import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
 from pathlib import Path
-
-# Check and install dependencies
-def check_dependencies():
-    """Check for required dependencies and prompt to install if missing"""
-    missing_deps = []
-    
-    try:
-        from dotenv import load_dotenv
-    except ImportError:
-        missing_deps.append("python-dotenv")
-    
-    try:
-        import google.generativeai as genai
-    except ImportError:
-        missing_deps.append("google-generativeai")
-    
-    if missing_deps:
-        print("Missing required dependencies:")
-        for dep in missing_deps:
-            print(f"  - {dep}")
-        print("\nPlease install them using:")
-        print(f"pip install {' '.join(missing_deps)}")
-        print("\nOr install all requirements:")
-        print("pip install -r requirements.txt")
-        sys.exit(1)
-
-# Check dependencies first
-check_dependencies()
-
-from dotenv import load_dotenv
-import google.generativeai as genai
+from itertools import chain, islice
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Spinner frames
 _SPINNERS = {
@@ -91,11 +79,54 @@ _SPINNERS = {
     "arrow": ['←','↖','↑','↗','→','↘','↓','↙']
 }
 
+# Translation cache: target language, entry lifetime in shared backends, key version
+_TARGET_LANG = 'ko'
+_CACHE_TTL = 86400 * 14
+_CACHE_KEY_VERSION = 'v1'
+# Seconds to wait on the shared Redis cache before treating it as unavailable
+_REDIS_TIMEOUT = 5
+
+# Batch limits: a batch is flushed once it would exceed either one
+MAX_ITEMS = 40
+MAX_CHARS = 4000
+
+# Concurrent batch dispatch (default number of requests in flight)
+_MAX_WORKERS = 8
+# Batches per worker read ahead from the subtitle stream at a time
+_WINDOW_BATCHES = 4
+# Distinct translations remembered across windows for reuse
+_RECENT_TRANSLATIONS = 10000
+
+# Retry policy for rate limits (429) and server errors (5xx)
+_RETRY_ATTEMPTS = 5
+_RETRY_MAX_WAIT = 30
+
+# Separator line between batch items in Gemini prompts and replies
+_SEGMENT_SPLIT_RE = re.compile(r'^\s*%%\s*$', re.M)
+
+# Cues with no words to translate: music notes, numbers, punctuation, bare URLs
+_SKIP_RE = re.compile(r'^[\W\d_♪\[\]\(\)\-\.\s]+$')
+_URL_RE = re.compile(r'^\s*(?:https?://|www\.)\S+\s*$')
+
+# Buffer size for VTT writes (fewer syscalls on large files)
+_IO_BUFFER_SIZE = 16 * 1024 * 1024
+
 # ANSI colors
 _GREEN = "\033[92m"
 _RED   = "\033[91m"
 _RESET = "\033[0m"
 
+def exit_missing_dependency(*packages):
+    """Print installation guidance for missing dependencies and exit"""
+    print("Missing required dependencies:")
+    for package in packages:
+        print(f"  - {package}")
+    print("\nPlease install them using:")
+    print(f"pip install {' '.join(packages)}")
+    print("\nOr install all requirements:")
+    print("pip install -r requirements.txt")
+    sys.exit(1)
+
 class Spinner:
     def __init__(self, text="Loading...", spinner="dots", interval=0.08, stream=sys.stdout):
         self.text = text
@@ -148,11 +179,8 @@ class Spinner:
             with self._render_lock:
                 self._render(line)
             i += 1
-            end = time.time() + self.interval
-            while time.time() < end:
-                if self._stop.is_set():
-                    break
-                time.sleep(0.01)
+            if self._stop.wait(self.interval):
+                break
 
     def start(self):
         if self._thread and self._thread.is_alive():
@@ -170,6 +198,13 @@ class Spinner:
             self._clear_line()
         self._show_cursor()
 
+    def write(self, text):
+        """Print a line above the spinner without splicing it into the current frame"""
+        with self._render_lock:
+            self._clear_line()
+            self.stream.write(text + "\n")
+            self.stream.flush()
+
     def succeed(self, text="Done."):
         self.stop()
         self.stream.write(f"{_GREEN}✔{_RESET} {text}\n")
@@ -189,8 +224,155 @@ class Spinner:
         else:
             self.succeed("Done.")
 
+class CacheBackend(ABC):
+    """Translation cache interface: maps (source text, target language) to a translation
+    
+    The cache is optional, so backends treat storage errors as misses: after the first one
+    they stop using storage and keep the error in self.error for the caller to report.
+    """
+
+    error = None
+
+    @abstractmethod
+    def get(self, text, lang):
+        """Return the cached translation of text, or None"""
+
+    @abstractmethod
+    def set(self, text, lang, translation, ttl=None):
+        """Store a translation, expiring after ttl seconds where the backend supports it"""
+
+    def get_many(self, texts, lang):
+        """Return a dict mapping each cached source text to its translation"""
+        hits = {}
+        for text in texts:
+            translation = self.get(text, lang)
+            if translation is not None:
+                hits[text] = translation
+        return hits
+
+    def set_many(self, pairs, lang, ttl=None):
+        """Store (source text, translation) pairs"""
+        for text, translation in pairs:
+            self.set(text, lang, translation, ttl)
+
+    def close(self):
+        pass
+
+class SQLiteBackend(CacheBackend):
+    """Per-user SQLite cache keyed by model, language and source text"""
+
+    def __init__(self, model_name, path=None):
+        self.model_name = model_name
+        self.path = path or (Path.home() / '.vtt-translate-cache.db')
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute("CREATE TABLE IF NOT EXISTS t(k TEXT PRIMARY KEY, v TEXT)")
+        self._conn.commit()
+
+    def _key(self, text, lang):
+        return hashlib.sha1(f"{self.model_name}|{lang}|{text}".encode('utf-8')).hexdigest()
+
+    def get(self, text, lang):
+        row = self._conn.execute("SELECT v FROM t WHERE k = ?", (self._key(text, lang),)).fetchone()
+        return row[0] if row is not None else None
+
+    def set(self, text, lang, translation, ttl=None):
+        self.set_many([(text, translation)], lang, ttl)
+
+    def get_many(self, texts, lang):
+        if self.error:
+            return {}
+        try:
+            return super().get_many(texts, lang)
+        except sqlite3.Error as e:
+            self.error = e
+            return {}
+
+    def set_many(self, pairs, lang, ttl=None):
+        # Entries never expire locally; ttl only applies to shared backends
+        if not pairs or self.error:
+            return
+        try:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO t(k, v) VALUES (?, ?)",
+                [(self._key(text, lang), translation) for text, translation in pairs]
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            self.error = e
+
+    def close(self):
+        self._conn.close()
+
+class RedisBackend(CacheBackend):
+    """Shared Redis cache so translations are reused across users and machines"""
+
+    def __init__(self, url):
+        import redis
+        self._redis = redis.Redis.from_url(url, socket_connect_timeout=_REDIS_TIMEOUT, socket_timeout=_REDIS_TIMEOUT)
+        self._errors = redis.exceptions.RedisError
+
+    def _key(self, text, lang):
+        return f"translate:{_CACHE_KEY_VERSION}:{hashlib.md5(text.encode('utf-8')).hexdigest()}:{lang}"
+
+    def ping(self):
+        self._redis.ping()
+
+    def get(self, text, lang):
+        return self.get_many([text], lang).get(text)
+
+    def set(self, text, lang, translation, ttl=None):
+        self.set_many([(text, translation)], lang, ttl)
+
+    def get_many(self, texts, lang):
+        if not texts or self.error:
+            return {}
+        try:
+            values = self._redis.mget([self._key(text, lang) for text in texts])
+        except self._errors as e:
+            self.error = e
+            return {}
+        return {text: value.decode('utf-8') for text, value in zip(texts, values) if value is not None}
+
+    def set_many(self, pairs, lang, ttl=None):
+        if not pairs or self.error:
+            return
+        pipe = self._redis.pipeline(transaction=False)
+        for text, translation in pairs:
+            pipe.set(self._key(text, lang), translation, ex=ttl)
+        try:
+            pipe.execute()
+        except self._errors as e:
+            self.error = e
+
+    def close(self):
+        self._redis.close()
+
+def open_cache(model_name):
+    """Return the shared Redis cache when VTT_REDIS_URL is set and reachable, otherwise the local
+    SQLite cache, or None when neither can be opened"""
+    redis_url = os.getenv('VTT_REDIS_URL')
+    if redis_url:
+        try:
+            backend = RedisBackend(redis_url)
+            backend.ping()
+            return backend
+        except ImportError:
+            print("✗ VTT_REDIS_URL is set but redis is not installed (pip install redis); using the local cache")
+        except Exception as e:
+            print(f"✗ Shared Redis cache unavailable ({e}); using the local cache")
+    try:
+        return SQLiteBackend(model_name)
+    except sqlite3.Error as e:
+        print(f"✗ Translation cache unavailable ({e}); continuing without it")
+        return None
+
 def load_environment():
     """Load environment variables from ~/.env file"""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        exit_missing_dependency("python-dotenv")
+    
     env_path = Path.home() / '.env'
     if env_path.exists():
         load_dotenv(env_path)
@@ -203,133 +385,378 @@ def load_environment():
     
     return api_key
 
-def parse_vtt_file(file_path):
-    """Parse VTT file and extract subtitle entries"""
+def read_vtt_header(file_path):
+    """Return the WEBVTT header block of a VTT file"""
     if not os.path.exists(file_path):
         print(f"Error: File '{file_path}' not found")
         sys.exit(1)
     
+    header_lines = []
     with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
+        for line in file:
+            line = line.rstrip('\n')
+            if not line.strip():
+                if header_lines:
+                    break
+                continue
+            if not header_lines and not line.strip().startswith('WEBVTT'):
+                break
+            header_lines.append(line.strip() if not header_lines else line)
     
-    # Split content into blocks
-    blocks = re.split(r'\n\s*\n', content.strip())
+    return '\n'.join(header_lines).rstrip() if header_lines else 'WEBVTT'
+
+def _mmap_lines(file_path):
+    """Yield the lines of a UTF-8 file through a read-only memory map, decoding one line at a time
     
-    subtitles = []
-    header = blocks[0] if blocks and blocks[0].startswith('WEBVTT') else 'WEBVTT'
+    Lines end at CRLF, LF or a bare CR, as WebVTT allows (and as text mode reads them).
+    """
+    if os.path.getsize(file_path) == 0:
+        return  # mmap can't map an empty file
+    with open(file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos = 0
+        size = len(mm)
+        next_lf = mm.find(b'\n')
+        next_cr = mm.find(b'\r')
+        while pos < size:
+            # Only search again once the previous hit is behind us, keeping the scan linear
+            if 0 <= next_lf < pos:
+                next_lf = mm.find(b'\n', pos)
+            if 0 <= next_cr < pos:
+                next_cr = mm.find(b'\r', pos)
+            end = min((e for e in (next_lf, next_cr) if e != -1), default=size)
+            yield mm[pos:end].decode('utf-8')
+            pos = end + 1
+            if end == next_cr and mm[pos:pos + 1] == b'\n':
+                pos += 1
+
+def parse_vtt_stream(file_path):
+    """Parse VTT file, yielding subtitle entries one at a time"""
+    if not os.path.exists(file_path):
+        print(f"Error: File '{file_path}' not found")
+        sys.exit(1)
     
-    for block in blocks[1:] if blocks[0].startswith('WEBVTT') else blocks:
-        if not block.strip():
+    timestamp = None
+    text_lines = []
+    
+    # Single pass over the lines; a blank line ends the current block.
+    # States: 'start' (nothing seen yet), 'header' (inside the WEBVTT block),
+    # 'idle' (between blocks), 'timestamp' (cue identifier seen, timing line expected),
+    # 'text' (collecting cue text), 'skip' (NOTE/STYLE or other non-cue block)
+    state = 'start'
+    for line in _mmap_lines(file_path):
+        if not line.strip():
+            if state == 'text' and text_lines:
+                yield {'timestamp': timestamp, 'text': '\n'.join(text_lines).rstrip()}
+            if state != 'start':
+                state = 'idle'
             continue
-            
-        lines = block.strip().split('\n')
-        if len(lines) >= 2:
-            # Check if first line is a timestamp
-            if '-->' in lines[0]:
-                timestamp = lines[0]
-                text = '\n'.join(lines[1:])
-            elif len(lines) >= 3 and '-->' in lines[1]:
+        
+        if state in ('start', 'idle'):
+            line = line.strip()
+            if state == 'start' and line.startswith('WEBVTT'):
+                # Header block is returned separately by read_vtt_header
+                state = 'header'
+            elif '-->' in line:
+                timestamp, text_lines = line, []
+                state = 'text'
+            else:
                 # First line might be a cue identifier
-                timestamp = lines[1]
-                text = '\n'.join(lines[2:])
+                state = 'timestamp'
+        elif state == 'timestamp':
+            if '-->' in line:
+                timestamp, text_lines = line, []
+                state = 'text'
             else:
-                continue
-            
-            subtitles.append({
-                'timestamp': timestamp,
-                'text': text
-            })
+                state = 'skip'
+        elif state == 'text':
+            text_lines.append(line)
     
-    return header, subtitles
+    if state == 'text' and text_lines:
+        yield {'timestamp': timestamp, 'text': '\n'.join(text_lines).rstrip()}
 
-def translate_text_batch(texts, model, spinner=None):
-    """Translate a batch of texts to Korean"""
+def translate_text_batch(texts, model, spinner=None, give_up=None, split_on_error=True):
+    """Translate a batch of texts to Korean
+    
+    Returns a list aligned with texts; entries that could not be translated are None.
+    give_up is a threading.Event shared by every batch in a run; it is set once a batch
+    runs out of retries, after which the rest only get a single attempt each.
+    """
     if not texts:
         return []
     
-    # Create a prompt for batch translation
-    prompt = """Translate the following English subtitle texts to Korean. 
+    # Create a prompt for batch translation. Items are separated by a %% line rather
+    # than numbered, so multi-line subtitles and renumbered replies can't shift alignment
+    prompt = f"""Translate the following English subtitle texts to Korean. 
 Keep the translations natural and appropriate for subtitles.
-Maintain the same number of lines as the input.
-Return only the translated texts, one per line, in the same order:
+The subtitle texts are separated by lines containing only %%.
+Separate each translated segment with a line containing only %%.
+Output exactly {len(texts)} segments, in the same order, and nothing else:
 
 """
-    
-    for i, text in enumerate(texts):
-        prompt += f"{i+1}. {text}\n"
+    prompt += "\n%%\n".join(texts)
     
     try:
-        if spinner:
-            spinner.text = "Translating batch with Gemini AI..."
-        response = model.generate_content(prompt)
-        translated_lines = response.text.strip().split('\n')
-        
-        # Clean up the translations (remove numbering if present)
-        cleaned_translations = []
-        for line in translated_lines:
-            # Remove leading numbers and dots if present
-            cleaned = re.sub(r'^\d+\.\s*', '', line.strip())
-            if cleaned:
-                cleaned_translations.append(cleaned)
-        
-        return cleaned_translations[:len(texts)]  # Ensure we don't have more translations than inputs
+        response = generate_with_retry(model, prompt, give_up)
+        # A blank line would end the cue early in the output file, so drop any inside a segment
+        parts = [
+            '\n'.join(line.strip() for line in part.splitlines() if line.strip())
+            for part in _SEGMENT_SPLIT_RE.split(response.text.strip())
+        ]
+    
+    except _retryable_errors() as e:
+        # Still rate limited or failing after all retries; smaller halves may get through.
+        # If they fail too, tell the other batches to stop retrying
+        if split_on_error and len(texts) > 1 and not (give_up and give_up.is_set()):
+            return _translate_halves(texts, model, spinner, give_up, split_on_error=False)
+        if give_up:
+            give_up.set()
+        _report_translation_error(e, spinner)
+        return [None] * len(texts)
     
     except Exception as e:
-        if spinner:
-            spinner.fail(f"Translation error: {e}")
-        else:
-            print(f"Translation error: {e}")
-        return texts  # Return original texts if translation fails
-
-def translate_subtitles(subtitles, api_key):
-    """Translate all subtitles using Gemini AI"""
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-2.5-flash')
+        _report_translation_error(e, spinner)
+        return [None] * len(texts)  # Caller keeps the original texts
     
-    print(f"Translating {len(subtitles)} subtitle entries...")
+    if len(parts) == len(texts) and all(parts):
+        return parts
     
-    # Batch process subtitles for efficiency
-    batch_size = 10
-    translated_subtitles = []
-    total_batches = (len(subtitles) + batch_size - 1) // batch_size
+    # Segment count came back wrong; retry each half so one bad item can't sink the batch
+    if len(texts) == 1:
+        return [None]
+    return _translate_halves(texts, model, spinner, give_up, split_on_error)
+
+def _translate_halves(texts, model, spinner=None, give_up=None, split_on_error=True):
+    mid = len(texts) // 2
+    return (translate_text_batch(texts[:mid], model, spinner, give_up, split_on_error)
+            + translate_text_batch(texts[mid:], model, spinner, give_up, split_on_error))
+
+def _report_translation_error(error, spinner=None):
+    if spinner:
+        spinner.write(f"{_RED}✖{_RESET} Translation error: {error}")
+    else:
+        print(f"Translation error: {error}")
+
+def _retryable_errors():
+    from google.api_core import exceptions as google_exceptions
+    return (
+        google_exceptions.ResourceExhausted,
+        google_exceptions.TooManyRequests,
+        google_exceptions.ServerError,
+    )
+
+def generate_with_retry(model, prompt, give_up=None):
+    """Call Gemini, retrying rate limits and server errors with exponential backoff and jitter
     
-    for i in range(0, len(subtitles), batch_size):
-        batch = subtitles[i:i + batch_size]
-        texts = [sub['text'] for sub in batch]
-        
-        batch_num = i // batch_size + 1
-        spinner_text = f"Batch {batch_num}/{total_batches}: Translating {len(texts)} subtitles"
-        
-        spinner = Spinner(text=spinner_text).start()
+    Once give_up is set the call is attempted only once, and any wait in progress ends early.
+    """
+    retryable = _retryable_errors()
+    give_up = give_up or threading.Event()
+    attempts = 1 if give_up.is_set() else _RETRY_ATTEMPTS
+    for attempt in range(attempts):
         try:
-            translated_texts = translate_text_batch(texts, model, spinner)
-            spinner.succeed(f"Batch {batch_num}/{total_batches}: Translated {len(texts)} subtitles")
-        except Exception as e:
-            spinner.fail(f"Batch {batch_num}/{total_batches}: Failed - {e}")
-            raise
-        
-        for j, sub in enumerate(batch):
-            translated_sub = {
-                'timestamp': sub['timestamp'],
-                'text': translated_texts[j] if j < len(translated_texts) else sub['text']
-            }
-            translated_subtitles.append(translated_sub)
-    
-    return translated_subtitles
-
-def write_vtt_file(header, subtitles, output_path):
-    """Write translated subtitles to VTT file"""
-    with open(output_path, 'w', encoding='utf-8') as file:
-        file.write(header + '\n\n')
+            return model.generate_content(prompt)
+        except retryable:
+            if attempt == attempts - 1:
+                raise
+            # Jittered waits of up to 4, 8, 16 then 30 seconds
+            if give_up.wait(random.uniform(0, min(_RETRY_MAX_WAIT, 2 ** (attempt + 2)))):
+                raise
+
+def is_translatable(text):
+    """Return False for cues with nothing to translate (symbols, numbers, punctuation, URLs)"""
+    return not (_SKIP_RE.match(text) or _URL_RE.match(text))
+
+def pack_batches(texts, max_items=MAX_ITEMS, max_chars=MAX_CHARS):
+    """Greedily group texts into batches bounded by item count and total characters"""
+    batches = []
+    batch = []
+    batch_chars = 0
+    for text in texts:
+        if batch and (len(batch) >= max_items or batch_chars + len(text) > max_chars):
+            batches.append(batch)
+            batch = []
+            batch_chars = 0
+        batch.append(text)
+        batch_chars += len(text)
+    if batch:
+        batches.append(batch)
+    return batches
+
+def translate_subtitles(subtitles, api_key, out_file, max_items=MAX_ITEMS, max_chars=MAX_CHARS,
+                        workers=_MAX_WORKERS, use_cache=True):
+    """Translate subtitles using Gemini AI, writing translated cues to out_file in input order
+    
+    Subtitles are consumed as a stream, a window at a time, and each window is written
+    as soon as its batches finish, so memory stays bounded regardless of file size.
+    Returns the number of distinct texts that could not be translated and were kept in English.
+    """
+    try:
+        import google.generativeai as genai
+        from google.generativeai import client as genai_client
+    except ImportError:
+        exit_missing_dependency("google-generativeai")
+    
+    model_name = 'gemini-2.5-flash'
+    genai.configure(api_key=api_key)
+    model = genai.GenerativeModel(model_name)
+    cache = open_cache(model_name) if use_cache else None
+    
+    # Build the shared client before any worker thread needs it, so every batch
+    # reuses one gRPC channel (one TLS handshake, requests multiplexed over HTTP/2)
+    # instead of threads racing to open their own on first use
+    genai_client.get_default_generative_client()
+    
+    # Batches are network-bound, so dispatch them concurrently; the pool size caps in-flight requests
+    completed = 0
+    total = 0
+    sent = 0
+    untranslated = 0
+    duplicates = 0
+    cached = 0
+    skipped = 0
+    spinner = None
+    
+    # Recently seen translations, so lines repeated across windows aren't resent. Capped
+    # (least recently used dropped first) to keep memory bounded; the cache covers the rest
+    recent = OrderedDict()
+    futures = {}
+    give_up = threading.Event()
+    stream = iter(subtitles)
+    window_size = max_items * workers * _WINDOW_BATCHES
+    
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                while True:
+                    window = list(islice(stream, window_size))
+                    if not window:
+                        break
+                    total += len(window)
+                    
+                    # Collapse repeated lines so each distinct text is translated only once
+                    translations = {}
+                    unique = []
+                    for text in dict.fromkeys(sub['text'] for sub in window):
+                        if text in recent:
+                            translations[text] = recent[text]
+                            recent.move_to_end(text)
+                        else:
+                            unique.append(text)
+                    duplicates += len(window) - len(unique)
+                    
+                    # Music notes, numbers, punctuation and URLs pass through untouched
+                    texts = []
+                    for text in unique:
+                        if is_translatable(text):
+                            texts.append(text)
+                        else:
+                            translations[text] = text
+                            skipped += 1
+                    
+                    # Serve previously translated texts from the cache, only send the rest to Gemini
+                    hits = cache.get_many(texts, _TARGET_LANG) if cache else {}
+                    translations.update(hits)
+                    cached += len(hits)
+                    misses = [text for text in texts if text not in hits]
+                    
+                    batches = pack_batches(misses, max_items, max_chars)
+                    if batches and spinner is None:
+                        spinner = Spinner(text="Translating subtitles").start()
+                    
+                    futures = {executor.submit(translate_text_batch, texts, model, spinner, give_up): texts for texts in batches}
+                    for future in as_completed(futures):
+                        batch = futures[future]
+                        translated_texts = future.result()
+                        
+                        # Untranslated entries come back as None; those keep the English text
+                        translated_pairs = [
+                            (text, translated) for text, translated in zip(batch, translated_texts)
+                            if translated is not None
+                        ]
+                        if cache:
+                            cache.set_many(translated_pairs, _TARGET_LANG, ttl=_CACHE_TTL)
+                        translations.update(translated_pairs)
+                        
+                        completed += 1
+                        sent += len(batch)
+                        untranslated += len(batch) - len(translated_pairs)
+                        spinner.text = f"Batch {completed}: Translated {sent} subtitles"
+                    
+                    # One joined write per window instead of two writes per cue
+                    out_file.write(''.join(
+                        f"{sub['timestamp']}\n{translations.get(sub['text'], sub['text'])}\n\n"
+                        for sub in window
+                    ))
+                    
+                    recent.update(translations)
+                    while len(recent) > _RECENT_TRANSLATIONS:
+                        recent.popitem(last=False)
+            except BaseException as e:
+                # Drop queued batches and cut short any retry waits so leaving the executor
+                # only waits for the requests already in flight
+                give_up.set()
+                for future in futures:
+                    future.cancel()
+                if spinner:
+                    spinner.fail(f"Batch {completed + 1}: Failed - {str(e) or type(e).__name__}")
+                raise
         
-        for subtitle in subtitles:
-            file.write(f"{subtitle['timestamp']}\n")
-            file.write(f"{subtitle['text']}\n\n")
+        if spinner and untranslated:
+            spinner.fail(f"Batches {completed}/{completed}: Translated {sent - untranslated} subtitles, "
+                         f"{untranslated} left in English")
+        elif spinner:
+            spinner.succeed(f"Batches {completed}/{completed}: Translated {sent} subtitles")
+    finally:
+        if cache:
+            cache.close()
     
-    print(f"Korean subtitles saved to: {output_path}")
-
-def main():
+    print(f"✓ Processed {total} subtitle entries")
+    if duplicates:
+        print(f"✓ {duplicates} duplicate subtitles reused earlier translations")
+    if cached:
+        print(f"✓ {cached} subtitles served from cache")
+    if skipped:
+        print(f"✓ {skipped} subtitles without translatable text kept as-is")
+    if cache and cache.error:
+        print(f"✗ Translation cache stopped working ({cache.error}); some translations were not cached")
+    
+    return untranslated
+
+def _new_file_mode(path):
+    """Permissions for a replacement of path: keep the existing mode, else the umask default"""
+    if os.path.exists(path):
+        return os.stat(path).st_mode & 0o777
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+def write_vtt_header(header, out_file):
+    """Write the VTT header block; cues are appended by translate_subtitles"""
+    out_file.write(header + '\n\n')
+
+def parse_args(argv=None):
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description="Translate English VTT subtitles to Korean with Gemini 2.5 Flash")
+    parser.add_argument('-i', '--input', help="English VTT file (prompted for when omitted)")
+    parser.add_argument('-o', '--output', help="Korean VTT file (default: input name with -ko suffix)")
+    parser.add_argument('--batch-size', type=int, default=MAX_ITEMS,
+                        help=f"maximum subtitles per API request (default: {MAX_ITEMS})")
+    parser.add_argument('--max-chars', type=int, default=MAX_CHARS,
+                        help=f"maximum characters per API request (default: {MAX_CHARS})")
+    parser.add_argument('--workers', type=int, default=_MAX_WORKERS,
+                        help=f"concurrent API requests (default: {_MAX_WORKERS})")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="don't read or write the translation cache")
+    args = parser.parse_args(argv)
+    for name in ('batch_size', 'max_chars', 'workers'):
+        if getattr(args, name) < 1:
+            parser.error(f"--{name.replace('_', '-')} must be at least 1")
+    return args
+
+def main(argv=None):
     """Main function"""
+    args = parse_args(argv)
+    
     title = "VTT Subtitle Translation Tool"
     subtitle = "Powered by Gemini 2.5 Flash AI Model"
     print(title)
@@ -339,12 +766,14 @@ def main():
     # Step 1: Get input file
     print("\nStep 1: Input file selection")
     default_file = "subtitles-en.vtt"
-    input_file = input(f"Enter VTT file path (default: {default_file}, type 'exit' to quit): ").strip()
-    if input_file.lower() == 'exit':
-        print("Goodbye!")
-        sys.exit(0)
-    if not input_file:
-        input_file = default_file
+    input_file = args.input
+    if input_file is None:
+        input_file = input(f"Enter VTT file path (default: {default_file}, type 'exit' to quit): ").strip()
+        if input_file.lower() == 'exit':
+            print("Goodbye!")
+            sys.exit(0)
+        if not input_file:
+            input_file = default_file
     
     # Step 2: Load environment and API key
     print("\nStep 2: Loading API configuration")
@@ -354,26 +783,49 @@ def main():
     # Step 3: Parse VTT file
     print(f"\nStep 3: Parsing VTT file")
     print(f"Reading file: {input_file}")
-    header, subtitles = parse_vtt_file(input_file)
-    print(f"✓ Detected English VTT file with {len(subtitles)} subtitle entries")
-    
-    if not subtitles:
+    header = read_vtt_header(input_file)
+    subtitles = parse_vtt_stream(input_file)
+    first_subtitle = next(subtitles, None)
+    if first_subtitle is None:
         print("✗ No subtitles found in the file")
         sys.exit(1)
+    print("✓ Detected English VTT file")
     
-    # Step 4: Translate subtitles
-    print(f"\nStep 4: Translating subtitles to Korean")
-    translated_subtitles = translate_subtitles(subtitles, api_key)
-    
-    # Step 5: Generate output filename
-    print(f"\nStep 5: Saving Korean VTT file")
+    # Step 4: Generate output filename
+    print(f"\nStep 4: Preparing Korean VTT file")
     input_path = Path(input_file)
-    output_file = input_path.stem.replace('-en', '') + "-ko.vtt"
+    output_file = args.output or input_path.stem.replace('-en', '') + "-ko.vtt"
+    if Path(output_file).resolve() == input_path.resolve():
+        print(f"Error: Output file '{output_file}' would overwrite the input file")
+        sys.exit(1)
+    print(f"Output file: {output_file}")
     
-    # Write Korean VTT file
-    write_vtt_file(header, translated_subtitles, output_file)
+    # Step 5: Translate subtitles, streaming them into the Korean VTT file
+    print(f"\nStep 5: Translating subtitles to Korean")
+    # Stream into a temp file next to the output and only replace the real file once
+    # translation has finished, so a failed or interrupted run never clobbers it
+    fd, temp_file = tempfile.mkstemp(dir=Path(output_file).resolve().parent,
+                                     prefix=f".{Path(output_file).name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', buffering=_IO_BUFFER_SIZE) as out_file:
+            write_vtt_header(header, out_file)
+            untranslated = translate_subtitles(
+                chain([first_subtitle], subtitles), api_key, out_file,
+                max_items=args.batch_size, max_chars=args.max_chars,
+                workers=args.workers, use_cache=not args.no_cache
+            )
+        os.chmod(temp_file, _new_file_mode(output_file))
+        os.replace(temp_file, output_file)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    print(f"Korean subtitles saved to: {output_file}")
     
-    print(f"✓ Translation completed successfully!")
+    if untranslated:
+        print(f"✗ {untranslated} subtitles could not be translated and were left in English")
+    else:
+        print(f"✓ Translation completed successfully!")
     print(f"✓ Korean subtitles saved as: {output_file}")
 
 if __name__ == "__main__":